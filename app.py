@@ -6,13 +6,16 @@ import re
 import shutil
 import tempfile
 import uuid
+import zipfile
+from collections import OrderedDict, deque
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 
-from scraper import scrape_creator
+from scraper import ASSETS_DIRNAME, ETAG_SUFFIX, scrape_creator
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,7 +25,18 @@ app = FastAPI(title="itch.io Scraper")
 WORK_DIR = Path(tempfile.gettempdir()) / "itch_scraper"
 WORK_DIR.mkdir(exist_ok=True)
 
-jobs: dict[str, dict] = {}
+_CREATOR_RE = re.compile(r"^[a-z0-9\-]+$")
+
+# Already-compressed image formats are stored as-is; deflating them again
+# costs CPU for next to no size reduction.
+_STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+MAX_JOBS = 128
+MAX_PROGRESS_LINES = 500
+STATUS_RECENT_LINES = 20
+
+# Least recently used first; finished jobs past MAX_JOBS are evicted.
+jobs: OrderedDict[str, dict] = OrderedDict()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -34,13 +48,23 @@ async def index():
 async def start_scrape(request: Request):
     body = await request.json()
     creator = body.get("creator", "").strip().lower()
-    if not creator or not re.match(r"^[a-z0-9\-]+$", creator):
+    if not creator or not _CREATOR_RE.match(creator):
         raise HTTPException(400, "Invalid creator name. Use the itch.io username (letters, numbers, hyphens).")
 
     job_id = uuid.uuid4().hex[:12]
-    jobs[job_id] = {"status": "running", "progress": [], "total": 0, "error": None, "zip": None}
-
+    jobs[job_id] = {
+        "status": "running",
+        "progress": deque(maxlen=MAX_PROGRESS_LINES),
+        "done": 0,
+        "total": 0,
+        "error": None,
+        "failed": [],
+        "zip": None,
+        "downloaded": False,
+    }
     asyncio.create_task(_run_scrape(job_id, creator))
+
+    await _evict_jobs()
     return {"job_id": job_id}
 
 
@@ -49,21 +73,35 @@ async def job_status(job_id: str):
     job = jobs.get(job_id)
     if not job:
         raise HTTPException(404, "Job not found")
-    return job
+    jobs.move_to_end(job_id)
+    return {
+        "status": job["status"],
+        "total": job["total"],
+        "done": job["done"],
+        "recent": list(job["progress"])[-STATUS_RECENT_LINES:],
+        "error": job["error"],
+        "failed": job["failed"],
+    }
 
 
 @app.get("/api/download/{job_id}")
 async def download_zip(job_id: str):
     job = jobs.get(job_id)
+    if job and job["downloaded"]:
+        raise HTTPException(410, "Zip already downloaded")
     if not job or not job.get("zip"):
         raise HTTPException(404, "Zip not ready")
+    jobs.move_to_end(job_id)
     zip_path = Path(job["zip"])
     if not zip_path.exists():
         raise HTTPException(404, "Zip file missing")
+    # The archive is served once; the job's files are removed after sending.
+    # If sending fails the task never runs, so the download can be retried.
     return FileResponse(
         zip_path,
         media_type="application/zip",
         filename=zip_path.name,
+        background=BackgroundTask(_cleanup_download, job_id, job),
     )
 
 
@@ -74,18 +112,61 @@ async def _run_scrape(job_id: str, creator: str):
     def on_progress(msg: str):
         if msg.startswith("__total__"):
             job["total"] = int(msg.replace("__total__", ""))
+        elif msg.startswith("__failed__"):
+            url = msg.replace("__failed__", "")
+            job["done"] += 1
+            job["failed"].append(url)
+            job["progress"].append(f"Failed: {url}")
         else:
+            job["done"] += 1
             job["progress"].append(msg)
 
     try:
         await scrape_creator(creator, output_dir, on_progress=on_progress)
 
-        zip_base = WORK_DIR / job_id / f"{creator}_itch"
-        zip_path = shutil.make_archive(str(zip_base), "zip", root_dir=str(output_dir))
+        zip_path = WORK_DIR / job_id / f"{creator}_itch.zip"
+        await asyncio.to_thread(_make_zip, output_dir, zip_path)
 
-        job["zip"] = zip_path
+        job["zip"] = str(zip_path)
         job["status"] = "done"
     except Exception as e:
         logger.exception("Scrape failed for %s", creator)
         job["status"] = "error"
         job["error"] = str(e)
+
+
+async def _cleanup_download(job_id: str, job: dict):
+    job["zip"] = None
+    job["downloaded"] = True
+    await asyncio.to_thread(shutil.rmtree, WORK_DIR / job_id, ignore_errors=True)
+
+
+async def _evict_jobs():
+    """Forget the least recently used finished jobs once over MAX_JOBS."""
+    # Pick and remove entries before awaiting, so concurrent callers never
+    # see (or try to evict) the same job.
+    evicted = []
+    for job_id in list(jobs):
+        if len(jobs) <= MAX_JOBS:
+            break
+        if jobs[job_id]["status"] == "running":
+            continue
+        del jobs[job_id]
+        evicted.append(job_id)
+    for job_id in evicted:
+        await asyncio.to_thread(shutil.rmtree, WORK_DIR / job_id, ignore_errors=True)
+
+
+def _make_zip(root_dir: Path, zip_path: Path) -> None:
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in sorted(root_dir.rglob("*")):
+            if not path.is_file() or path.suffix == ETAG_SUFFIX:
+                continue
+            if path.relative_to(root_dir).parts[0] == ASSETS_DIRNAME:
+                continue
+            compress_type = (
+                zipfile.ZIP_STORED
+                if path.suffix.lower() in _STORED_SUFFIXES
+                else zipfile.ZIP_DEFLATED
+            )
+            zf.write(path, path.relative_to(root_dir), compress_type=compress_type)
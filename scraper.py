@@ -1,50 +1,244 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
+import os
+import random
 import re
+import shutil
+from contextlib import asynccontextmanager, nullcontext
 from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 
 import httpx
-from bs4 import BeautifulSoup, Tag
+from lxml import etree
+from lxml import html as lxml_html
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
 ITCH_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+ITCH_LIMITS = httpx.Limits(
+    max_keepalive_connections=32, max_connections=64, keepalive_expiry=30.0
+)
+USER_AGENT = "itch-scraper"
+IMAGE_CDN_URL = "https://img.itch.zone"
 MAX_CONCURRENT_DOWNLOADS = 6
+MAX_CONCURRENT_PAGES = 20
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_ATTEMPTS = 4
+MAX_RETRY_DELAY = 60.0
+# Sidecar suffix for the ETag of a downloaded file, used for conditional GETs.
+ETAG_SUFFIX = ".etag"
+# Per-creator directory holding each distinct image once; project images
+# are hard links into it.
+ASSETS_DIRNAME = "_assets"
+
+_WS = re.compile(r"\s+")
+
+
+def _backoff(attempt: int, resp: httpx.Response | None = None) -> float:
+    """Seconds to wait before the next attempt, honouring Retry-After."""
+    if resp is not None:
+        try:
+            return min(max(float(resp.headers["Retry-After"]), 0.0), MAX_RETRY_DELAY)
+        except (KeyError, ValueError):
+            pass
+    return 2**attempt + random.random()
+
+
+@asynccontextmanager
+async def _stream(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict[str, str] | None = None,
+    sem: asyncio.Semaphore | None = None,
+):
+    """Stream a GET of *url*, retrying transport errors, 429s and 5xx responses.
+
+    *sem* is held while a request is in flight and while the caller reads
+    the response, but not during backoff sleeps.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        last = attempt == MAX_ATTEMPTS - 1
+        async with sem or nullcontext():
+            request = client.build_request("GET", url, headers=headers)
+            try:
+                resp = await client.send(request, stream=True, follow_redirects=True)
+            except httpx.TransportError:
+                if last:
+                    raise
+                logger.info("Retrying %s after transport error", url)
+                delay = _backoff(attempt)
+            else:
+                if last or (resp.status_code != 429 and resp.status_code < 500):
+                    try:
+                        yield resp
+                    finally:
+                        await resp.aclose()
+                    return
+                await resp.aclose()
+                logger.info("Retrying %s after HTTP %d", url, resp.status_code)
+                delay = _backoff(attempt, resp)
+        await asyncio.sleep(delay)
+
+
+async def _prewarm(client: httpx.AsyncClient, url: str) -> None:
+    """Open a pooled connection to *url*'s host so DNS and TLS are done early."""
+    try:
+        await client.head(url)
+    except httpx.HTTPError:
+        logger.debug("Prewarm of %s failed", url, exc_info=True)
 
 
-async def _fetch(client: httpx.AsyncClient, url: str) -> httpx.Response:
-    resp = await client.get(url, follow_redirects=True)
-    resp.raise_for_status()
+async def _fetch(
+    client: httpx.AsyncClient, url: str, sem: asyncio.Semaphore | None = None
+) -> httpx.Response:
+    async with _stream(client, url, sem=sem) as resp:
+        resp.raise_for_status()
+        await resp.aread()
     return resp
 
 
-async def _download_file(client: httpx.AsyncClient, url: str, dest: Path) -> bool:
+async def _download_file(
+    client: httpx.AsyncClient, url: str, dest: Path, sem: asyncio.Semaphore
+) -> bool:
+    etag_path = dest.with_name(dest.name + ETAG_SUFFIX)
+    headers = {}
+    if dest.exists() and dest.stat().st_size > 0:
+        if not etag_path.exists():
+            return True
+        headers["If-None-Match"] = etag_path.read_text(encoding="utf-8")
+
+    # Written under a temporary name and renamed into place, so an
+    # interrupted download never looks like a finished one.
+    part = dest.with_name(dest.name + ".part")
     try:
-        resp = await client.get(url, follow_redirects=True)
-        resp.raise_for_status()
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        dest.write_bytes(resp.content)
+        async with _stream(client, url, headers=headers, sem=sem) as resp:
+            if resp.status_code == 304:
+                return True
+            resp.raise_for_status()
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            f = await asyncio.to_thread(part.open, "wb")
+            try:
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+        etag_path.unlink(missing_ok=True)
+        part.replace(dest)
+        etag = resp.headers.get("ETag")
+        if etag:
+            etag_path.write_text(etag, encoding="utf-8")
         return True
     except Exception:
         logger.warning("Failed to download %s", url, exc_info=True)
         return False
+    finally:
+        part.unlink(missing_ok=True)
+
+
+async def _download_shared(
+    client: httpx.AsyncClient,
+    url: str,
+    dest: Path,
+    sem: asyncio.Semaphore,
+    asset_cache: dict[str, asyncio.Task[bool]],
+    assets_dir: Path,
+) -> bool:
+    """Download *url* once per scrape into *assets_dir* and link it to *dest*."""
+    cached = assets_dir / (hashlib.sha1(url.encode()).hexdigest() + _ext_from_url(url))
+    task = asset_cache.get(url)
+    if task is None:
+        task = asyncio.create_task(_download_file(client, url, cached, sem))
+        asset_cache[url] = task
+    # Other projects may be waiting on the same download; don't cancel it
+    # just because this caller is cancelled.
+    if not await asyncio.shield(task):
+        return False
+    try:
+        await asyncio.to_thread(_link_file, cached, dest)
+        return True
+    except OSError:
+        logger.warning("Failed to link %s to %s", cached, dest, exc_info=True)
+        return False
+
+
+def _link_file(src: Path, dest: Path) -> None:
+    if dest.exists() and os.path.samefile(src, dest):
+        return
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        # Filesystem without hard-link support
+        shutil.copyfile(src, dest)
 
 
 def _ext_from_url(url: str) -> str:
-    path = url.split("?")[0]
-    if "." in path.split("/")[-1]:
-        return "." + path.split("/")[-1].rsplit(".", 1)[-1]
-    return ".jpg"
+    ext = os.path.splitext(urlsplit(url).path)[1]
+    return ext or ".jpg"
+
+
+def _dump_json(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
 
 
 def _clean(text: str | None) -> str:
     if not text:
         return ""
-    return re.sub(r"\s+", " ", text).strip()
+    return _WS.sub(" ", text).strip()
+
+
+def _parse_html(content: bytes, encoding: str | None = None) -> lxml_html.HtmlElement:
+    """Parse a page body, treating an empty document as an empty tree."""
+    # lxml rejects str input with an XML encoding declaration, so parse the
+    # raw bytes using the encoding httpx would have decoded them with.
+    parser = lxml_html.HTMLParser(encoding=encoding)
+    try:
+        return lxml_html.fromstring(content, parser=parser)
+    except etree.ParserError:
+        return lxml_html.Element("html")
+
+
+def _cls(name: str) -> str:
+    """XPath predicate equivalent to the CSS class selector ``.name``."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Creator page selectors, compiled once at import time.
+XP_GAME_LINKS = etree.XPath(
+    f"//*[{_cls('game_cell')}]//a[{_cls('game_link')} or {_cls('title')}]/@href"
+)
+XP_GAME_THUMB_LINKS = etree.XPath(
+    f"//*[{_cls('game_cell')}]//*[{_cls('game_thumb')}]//a/@href"
+)
+XP_NEXT_PAGE = etree.XPath(f"//a[{_cls('next_page')}]")
+
+# Project page selectors, compiled once at import time.
+XP_TITLE = etree.XPath(f"//h1[{_cls('game_title')}]")
+XP_META = etree.XPath("//meta[@content and (@property or @itemprop)]")
+XP_DESCRIPTION = etree.XPath(f"//*[{_cls('formatted_description')}]")
+XP_TAGS = etree.XPath(
+    f"//*[{_cls('game_info_panel_widget')}]//a[contains(@href, '/tag-')]"
+)
+XP_INFO_ROWS = etree.XPath(f"//*[{_cls('game_info_panel_widget')}]//table//tr")
+XP_ROW_CELLS = etree.XPath("td")
+XP_PRICE = etree.XPath(f"//*[{_cls('buy_btn_widget')}]//*[{_cls('price')}]")
+XP_PLATFORM_CLASSES = etree.XPath(
+    f"//*[{_cls('game_info_panel_widget')}]//*[{_cls('icon')}]/@class"
+)
+XP_COVER_IMG = etree.XPath(f"//*[{_cls('header')} or {_cls('game_cover')}]//img")
+XP_SCREENSHOT_LINKS = etree.XPath(f"//*[{_cls('screenshot_list')}]//a/@href")
+XP_SCREENSHOT_IMGS = etree.XPath(f"//*[{_cls('screenshot_list')}]//img")
 
 
 # ── Creator page parsing ────────────────────────────────────────────
@@ -53,26 +247,27 @@ async def fetch_project_urls(client: httpx.AsyncClient, creator: str) -> list[st
     """Return all public project URLs for a creator, handling pagination."""
     base = f"https://{creator}.itch.io"
     urls: list[str] = []
+    seen: set[str] = set()
     page = 1
 
     while True:
         page_url = base if page == 1 else f"{base}?page={page}"
         resp = await _fetch(client, page_url)
-        soup = BeautifulSoup(resp.text, "lxml")
+        doc = _parse_html(resp.content, resp.encoding)
 
-        cells = soup.select(".game_cell a.game_link, .game_cell a.title")
-        if not cells:
+        hrefs = XP_GAME_LINKS(doc)
+        if not hrefs:
             # also try the thumb link
-            cells = soup.select(".game_cell .game_thumb a")
+            hrefs = XP_GAME_THUMB_LINKS(doc)
 
         found = 0
-        for a in cells:
-            href = a.get("href")
-            if href and href not in urls:
+        for href in hrefs:
+            if href and href not in seen:
+                seen.add(str(href))
                 urls.append(str(href))
                 found += 1
 
-        next_btn = soup.select_one("a.next_page")
+        next_btn = XP_NEXT_PAGE(doc)
         if not next_btn or found == 0:
             break
         page += 1
@@ -82,106 +277,128 @@ async def fetch_project_urls(client: httpx.AsyncClient, creator: str) -> list[st
 
 # ── Single project scraping ─────────────────────────────────────────
 
-async def scrape_project(
-    client: httpx.AsyncClient,
-    url: str,
-    sem: asyncio.Semaphore,
-    base_dir: Path,
-    on_progress=None,
-) -> dict:
-    async with sem:
-        resp = await _fetch(client, url)
+def _extract_project(
+    content: bytes, encoding: str | None, url: str
+) -> tuple[dict, str | None, list[str]]:
+    """Parse a project page into (metadata fields, cover URL, screenshot URLs)."""
+    doc = _parse_html(content, encoding)
 
-    soup = BeautifulSoup(resp.text, "lxml")
+    # One pass over <meta> instead of a document scan per property.
+    meta: dict[str, str] = {}
+    for el in XP_META(doc):
+        meta.setdefault(el.get("property") or el.get("itemprop"), el.get("content"))
 
-    title = _clean(soup.select_one("h1.game_title")
-                   and soup.select_one("h1.game_title").get_text())
+    title_els = XP_TITLE(doc)
+    title = _clean(title_els[0].text_content()) if title_els else ""
     if not title:
-        og = soup.select_one('meta[property="og:title"]')
-        title = og["content"] if og else url.rsplit("/", 1)[-1]
-
-    slug = url.rstrip("/").rsplit("/", 1)[-1]
-    project_dir = base_dir / slug
-    project_dir.mkdir(parents=True, exist_ok=True)
+        title = meta.get("og:title", url.rsplit("/", 1)[-1])
 
     description = ""
-    desc_el = soup.select_one(".formatted_description")
-    if desc_el:
-        description = _clean(desc_el.get_text())
+    desc_els = XP_DESCRIPTION(doc)
+    if desc_els:
+        description = _clean(desc_els[0].text_content())
 
-    short_text = ""
-    st_el = soup.select_one('meta[property="og:description"]')
-    if st_el:
-        short_text = _clean(str(st_el.get("content", "")))
+    short_text = _clean(meta.get("og:description"))
 
     # Tags / classification
     tags: list[str] = []
-    for tag_a in soup.select(".game_info_panel_widget a[href*='/tag-']"):
-        tags.append(_clean(tag_a.get_text()))
+    for tag_a in XP_TAGS(doc):
+        tags.append(_clean(tag_a.text_content()))
 
     # Info panel key-value pairs
     info: dict[str, str] = {}
-    info_table = soup.select(".game_info_panel_widget table tr")
-    for row in info_table:
-        cells = row.select("td")
+    for row in XP_INFO_ROWS(doc):
+        cells = XP_ROW_CELLS(row)
         if len(cells) == 2:
-            key = _clean(cells[0].get_text()).rstrip(":")
-            val = _clean(cells[1].get_text())
+            key = _clean(cells[0].text_content()).rstrip(":")
+            val = _clean(cells[1].text_content())
             if key:
                 info[key] = val
 
     # Price
-    buy_btn = soup.select_one(".buy_btn_widget .price")
-    price = _clean(buy_btn.get_text()) if buy_btn else "Free"
+    buy_btn = XP_PRICE(doc)
+    price = _clean(buy_btn[0].text_content()) if buy_btn else "Free"
 
     # Platforms
     platforms: list[str] = []
-    for span in soup.select(".game_info_panel_widget .icon"):
-        cls = span.get("class", [])
-        for c in cls:
+    for cls in XP_PLATFORM_CLASSES(doc):
+        for c in cls.split():
             if c.startswith("icon-"):
                 platforms.append(c.replace("icon-", ""))
 
     # Rating
-    rating_el = soup.select_one('meta[itemprop="ratingValue"]')
-    rating_count_el = soup.select_one('meta[itemprop="ratingCount"]')
-    rating = rating_el["content"] if rating_el else None
-    rating_count = rating_count_el["content"] if rating_count_el else None
-
-    # ── Images ───────────────────────────────────────────────────────
-    images_dir = project_dir / "images"
-    images_dir.mkdir(exist_ok=True)
-    download_tasks = []
+    rating = meta.get("ratingValue")
+    rating_count = meta.get("ratingCount")
 
     # Cover / capsule image
-    cover_url = None
-    cover_el = soup.select_one('meta[property="og:image"]')
-    if cover_el:
-        cover_url = str(cover_el["content"])
+    cover_url = meta.get("og:image")
     if not cover_url:
-        cover_el = soup.select_one(".header img, .game_cover img")
-        if cover_el:
+        cover_imgs = XP_COVER_IMG(doc)
+        if cover_imgs:
+            cover_el = cover_imgs[0]
             cover_url = str(cover_el.get("src") or cover_el.get("data-lazy_src", ""))
 
-    cover_saved = None
-    if cover_url:
-        ext = _ext_from_url(cover_url)
-        cover_dest = images_dir / f"cover{ext}"
-        download_tasks.append(("cover", cover_url, cover_dest))
-        cover_saved = f"images/cover{ext}"
-
     # Screenshots
     screenshot_urls: list[str] = []
-    for a_tag in soup.select(".screenshot_list a"):
-        href = a_tag.get("href")
+    for href in XP_SCREENSHOT_LINKS(doc):
         if href:
             screenshot_urls.append(str(href))
     if not screenshot_urls:
-        for img in soup.select(".screenshot_list img"):
+        for img in XP_SCREENSHOT_IMGS(doc):
             src = img.get("src") or img.get("data-lazy_src")
             if src:
                 screenshot_urls.append(str(src))
 
+    fields = {
+        "title": title,
+        "short_description": short_text,
+        "description": description,
+        "tags": tags,
+        "info": info,
+        "price": price,
+        "platforms": platforms,
+        "rating": rating,
+        "rating_count": rating_count,
+    }
+    return fields, cover_url, screenshot_urls
+
+
+async def scrape_project(
+    client: httpx.AsyncClient,
+    url: str,
+    sem: asyncio.Semaphore,
+    base_dir: Path,
+    on_progress=None,
+    page_sem: asyncio.Semaphore | None = None,
+    asset_cache: dict[str, asyncio.Task[bool]] | None = None,
+) -> dict:
+    if asset_cache is None:
+        asset_cache = {}
+    resp = await _fetch(client, url, page_sem or sem)
+
+    # lxml releases the GIL while parsing, so other projects keep
+    # fetching and parsing while this page is processed.
+    fields, cover_url, screenshot_urls = await asyncio.to_thread(
+        _extract_project, resp.content, resp.encoding, url
+    )
+    title = fields.pop("title")
+
+    slug = url.rstrip("/").rsplit("/", 1)[-1]
+    project_dir = base_dir / slug
+    project_dir.mkdir(parents=True, exist_ok=True)
+
+    # ── Images ───────────────────────────────────────────────────────
+    images_dir = project_dir / "images"
+    images_dir.mkdir(exist_ok=True)
+    download_tasks = []
+
+    cover_saved = None
+    if cover_url:
+        ext = _ext_from_url(cover_url)
+        cover_dest = images_dir / f"cover{ext}"
+        download_tasks.append(("cover", cover_url, cover_dest))
+        cover_saved = f"images/cover{ext}"
+
     screenshot_saved: list[str] = []
     for i, surl in enumerate(screenshot_urls):
         ext = _ext_from_url(surl)
@@ -190,28 +407,25 @@ async def scrape_project(
         screenshot_saved.append(f"images/screenshot_{i}{ext}")
 
     # Download all images concurrently
-    async with sem:
-        for _, img_url, dest in download_tasks:
-            await _download_file(client, img_url, dest)
+    assets_dir = base_dir / ASSETS_DIRNAME
+    await asyncio.gather(
+        *(
+            _download_shared(client, img_url, dest, sem, asset_cache, assets_dir)
+            for _, img_url, dest in download_tasks
+        )
+    )
 
     metadata = {
         "url": url,
         "title": title,
         "slug": slug,
-        "short_description": short_text,
-        "description": description,
-        "tags": tags,
-        "info": info,
-        "price": price,
-        "platforms": platforms,
-        "rating": rating,
-        "rating_count": rating_count,
+        **fields,
         "cover_image": cover_saved,
         "screenshots": screenshot_saved,
     }
 
-    (project_dir / "metadata.json").write_text(
-        json.dumps(metadata, indent=2, ensure_ascii=False), encoding="utf-8"
+    await asyncio.to_thread(
+        (project_dir / "metadata.json").write_bytes, _dump_json(metadata)
     )
 
     if on_progress:
@@ -229,27 +443,56 @@ async def scrape_creator(
 ) -> list[dict]:
     output_dir.mkdir(parents=True, exist_ok=True)
     sem = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
-
-    async with httpx.AsyncClient(timeout=ITCH_TIMEOUT, http2=False) as client:
-        project_urls = await fetch_project_urls(client, creator)
+    page_sem = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+    asset_cache: dict[str, asyncio.Task[bool]] = {}
+
+    async with httpx.AsyncClient(
+        timeout=ITCH_TIMEOUT,
+        http2=True,
+        limits=ITCH_LIMITS,
+        headers={"User-Agent": USER_AGENT},
+    ) as client:
+        # The listing warms the creator's host; warm the image CDN alongside it.
+        project_urls, _ = await asyncio.gather(
+            fetch_project_urls(client, creator), _prewarm(client, IMAGE_CDN_URL)
+        )
         if not project_urls:
             raise ValueError(f"No public projects found for '{creator}'")
 
         if on_progress:
             on_progress(f"__total__{len(project_urls)}")
 
-        results = []
-        for url in project_urls:
-            meta = await scrape_project(client, url, sem, output_dir, on_progress)
-            results.append(meta)
+        outcomes = await asyncio.gather(
+            *(
+                scrape_project(
+                    client, url, sem, output_dir, on_progress, page_sem, asset_cache
+                )
+                for url in project_urls
+            ),
+            return_exceptions=True,
+        )
+
+    results = []
+    errors = []
+    failed: list[str] = []
+    for url, outcome in zip(project_urls, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.warning("Failed to scrape %s", url, exc_info=outcome)
+            errors.append(outcome)
+            failed.append(url)
+            if on_progress:
+                on_progress(f"__failed__{url}")
+        else:
+            results.append(outcome)
+    if errors and not results:
+        raise errors[0]
 
     # Write a summary index
-    (output_dir / "index.json").write_text(
-        json.dumps(
-            {"creator": creator, "project_count": len(results), "projects": results},
-            indent=2,
-            ensure_ascii=False,
-        ),
-        encoding="utf-8",
-    )
+    index = {
+        "creator": creator,
+        "project_count": len(results),
+        "projects": results,
+        "failed": failed,
+    }
+    await asyncio.to_thread((output_dir / "index.json").write_bytes, _dump_json(index))
     return results